@@ -0,0 +1,500 @@
+"""
+Attendee Matching - People to Meet
+----------------------------------
+This script serves "people to meet" recommendations from a precomputed sparse
+kNN similarity graph, instead of recomputing pairwise attendee similarity for
+every request the way network_analysis_v1.ipynb does.
+
+Attendee similarity follows the notebook recipe (Part 2):
+- TF-IDF of Education + Specialization (weight 0.4)
+- TF-IDF of Job title (weight 0.3)
+- Binary skills (weight 0.2)
+- Binary interests (weight 0.1)
+Each block is L2-normalised and scaled by sqrt(weight), so the dot product of
+two attendee vectors equals the notebook's weighted sum of cosine similarities.
+
+Layout on disk:
+    attendee_graph/
+        features.npz     (sparse attendee feature matrix)
+        knn.npz          (top-k neighbour ids and scores per attendee)
+        attendees.csv    (A_ID, Job_title, Specialization in row order)
+        rosters.json     (event_id -> list of A_IDs)
+        vocabularies.json (TF-IDF vocabularies, skills, interests and weights)
+        idf.npz          (TF-IDF idf weights; with vocabularies.json, used to
+                          embed new attendees)
+
+Key functions:
+1. build_match_index - build and persist the graph from processed_data.csv and
+   the event-attendee pair files
+2. AttendeeMatcher.people_to_meet - top-k compatible attendees, optionally
+   restricted to an event's roster
+3. AttendeeMatcher.add_attendees / add_attendance - incremental updates
+"""
+
+import os
+import sys
+import ast
+import json
+import argparse
+import traceback
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+DEFAULT_GRAPH_DIR = "attendee_graph"
+DEFAULT_WEIGHTS = {
+    'edu_spec': 0.4,  # Education and Specialization
+    'job': 0.3,       # Job title
+    'skill': 0.2,     # Skills
+    'interest': 0.1   # Interests
+}
+
+
+def parse_list_string(s):
+    """
+    Parse a string representation of a list, e.g. "['item1', 'item2']"
+    """
+    if pd.isna(s) or s == '':
+        return []
+    try:
+        return ast.literal_eval(s)
+    except (SyntaxError, ValueError):
+        items = s.strip('[]').split(',')
+        return [item.strip().strip("'\"") for item in items if item.strip()]
+
+
+def normalize_attendee_id(attendee_id):
+    """
+    Attendee ids are stored upper-case ('a925' in the pair files -> 'A925')
+    """
+    return str(attendee_id).strip().upper()
+
+
+def normalize_event_id(event_id):
+    """
+    Event ids are stored lower-case, as in the event and pair files ('E7' -> 'e7')
+    """
+    return str(event_id).strip().lower()
+
+
+def prepare_attendees(attendees_df):
+    """
+    Clean the attendee columns used for matching (same steps as the notebook)
+    """
+    df = attendees_df.copy()
+    df.columns = df.columns.str.strip()
+    df['A_ID'] = df['A_ID'].map(normalize_attendee_id)
+    for col in ['Education', 'Specialization', 'Job_title']:
+        df[col] = df[col].fillna('').astype(str).str.lower().str.strip()
+    df['processed_skills_list'] = df['processed_skills'].apply(parse_list_string)
+    df['processed_interests_list'] = df['processed_interests'].apply(parse_list_string)
+    return df
+
+
+def load_rosters(pairs_paths):
+    """
+    Load event-attendee pair files into {event_id: [A_ID, ...]}
+    """
+    rosters = {}
+    for path in pairs_paths:
+        pairs_df = pd.read_csv(path)
+        pairs_df.columns = [col.strip().lower() for col in pairs_df.columns]
+        for event_id, attendee_id in zip(pairs_df['event_id'], pairs_df['attendee_id']):
+            roster = rosters.setdefault(normalize_event_id(event_id), [])
+            attendee_id = normalize_attendee_id(attendee_id)
+            if attendee_id not in roster:
+                roster.append(attendee_id)
+    return rosters
+
+
+def _binary_matrix(lists, vocabulary):
+    """
+    Build a sparse binary matrix from lists of labels, ignoring unknown labels
+    """
+    index = {label: i for i, label in enumerate(vocabulary)}
+    rows, cols = [], []
+    for row, labels in enumerate(lists):
+        for col in {index[label] for label in labels if label in index}:
+            rows.append(row)
+            cols.append(col)
+    return sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(lists), len(vocabulary)))
+
+
+class AttendeeFeaturizer:
+    """
+    Turns prepared attendee rows into weighted, normalised sparse vectors
+    """
+
+    def __init__(self, weights=None):
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.edu_spec_vectorizer = TfidfVectorizer(min_df=2, max_features=1000)
+        self.job_vectorizer = TfidfVectorizer(min_df=2, max_features=500)
+        self.skills = []
+        self.interests = []
+
+    def fit(self, df):
+        self.edu_spec_vectorizer.fit(df['Education'] + ' ' + df['Specialization'])
+        self.job_vectorizer.fit(df['Job_title'])
+        self.skills = sorted(set(skill for skills in df['processed_skills_list'] for skill in skills))
+        self.interests = sorted(set(interest for interests in df['processed_interests_list'] for interest in interests))
+        return self
+
+    def save(self, graph_dir):
+        """
+        Persist vocabularies as JSON and idf weights as npz (no pickled estimators)
+        """
+        vocabularies = {
+            'weights': self.weights,
+            'edu_spec_vocabulary': {term: int(i) for term, i in self.edu_spec_vectorizer.vocabulary_.items()},
+            'job_vocabulary': {term: int(i) for term, i in self.job_vectorizer.vocabulary_.items()},
+            'skills': self.skills,
+            'interests': self.interests
+        }
+        with open(os.path.join(graph_dir, "vocabularies.json"), "w") as f:
+            json.dump(vocabularies, f)
+        np.savez(os.path.join(graph_dir, "idf.npz"), edu_spec=self.edu_spec_vectorizer.idf_, job=self.job_vectorizer.idf_)
+
+    @classmethod
+    def load(cls, graph_dir):
+        """
+        Rebuild the fitted vectorizers from vocabularies.json and idf.npz
+        """
+        with open(os.path.join(graph_dir, "vocabularies.json"), "r") as f:
+            vocabularies = json.load(f)
+        idf = np.load(os.path.join(graph_dir, "idf.npz"))
+
+        featurizer = cls(vocabularies['weights'])
+        featurizer.edu_spec_vectorizer = TfidfVectorizer(vocabulary=vocabularies['edu_spec_vocabulary'])
+        featurizer.edu_spec_vectorizer.idf_ = idf['edu_spec']
+        featurizer.job_vectorizer = TfidfVectorizer(vocabulary=vocabularies['job_vocabulary'])
+        featurizer.job_vectorizer.idf_ = idf['job']
+        featurizer.skills = vocabularies['skills']
+        featurizer.interests = vocabularies['interests']
+        return featurizer
+
+    def transform(self, df):
+        blocks = [
+            ('edu_spec', self.edu_spec_vectorizer.transform(df['Education'] + ' ' + df['Specialization'])),
+            ('job', self.job_vectorizer.transform(df['Job_title'])),
+            ('skill', _binary_matrix(df['processed_skills_list'], self.skills)),
+            ('interest', _binary_matrix(df['processed_interests_list'], self.interests)),
+        ]
+        weighted = [normalize(block) * np.sqrt(self.weights[name]) for name, block in blocks]
+        return sp.hstack(weighted, format='csr', dtype=np.float32)
+
+
+def knn_from_features(queries, features, k, exclude=None, block_size=1024):
+    """
+    Top-k most similar rows of `features` for each row of `queries`
+
+    Parameters:
+    - queries: Sparse query matrix
+    - features: Sparse matrix of all attendees
+    - k: Number of neighbours to keep
+    - exclude: Optional array giving, for each query, a feature row to skip (itself)
+    - block_size: Number of queries scored at once
+
+    Returns:
+    - tuple: (neighbours, scores) arrays of shape (n_queries, k), padded with
+      -1 / -inf when there are fewer than k candidates
+    """
+    n_queries = queries.shape[0]
+    neighbours = np.full((n_queries, k), -1, dtype=np.int32)
+    scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+
+    for start in range(0, n_queries, block_size):
+        stop = min(start + block_size, n_queries)
+        block = (queries[start:stop] @ features.T).toarray()
+        if exclude is not None:
+            block[np.arange(stop - start), exclude[start:stop]] = -np.inf
+        kk = min(k, block.shape[1])
+        if kk == 0:
+            continue
+        top = np.argpartition(-block, kk - 1, axis=1)[:, :kk]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        neighbours[start:stop, :kk] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop, :kk] = np.take_along_axis(top_scores, order, axis=1)
+
+    neighbours[~np.isfinite(scores)] = -1
+    return neighbours, scores
+
+
+class AttendeeMatcher:
+    """
+    Serves people-to-meet lookups from a persisted kNN graph
+
+    Example:
+        matcher = AttendeeMatcher.load("attendee_graph")
+        matcher.people_to_meet("A1", event_id="e101", top_k=5)
+    """
+
+    def __init__(self, attendees_df, features, neighbours, scores, rosters, featurizer):
+        self.attendees_df = attendees_df.reset_index(drop=True)
+        self.features = features
+        self.neighbours = neighbours
+        self.scores = scores
+        self.rosters = rosters
+        self.featurizer = featurizer
+        self.id_to_index = {aid: i for i, aid in enumerate(self.attendees_df['A_ID'])}
+        self.attendee_events = {}
+        for event_id, roster in rosters.items():
+            for attendee_id in roster:
+                self.attendee_events.setdefault(attendee_id, set()).add(event_id)
+
+    @property
+    def k(self):
+        return self.neighbours.shape[1]
+
+    @classmethod
+    def build(cls, attendees_df, rosters, k=20, weights=None):
+        """
+        Build the kNN graph from raw attendee rows and event rosters
+        """
+        df = prepare_attendees(attendees_df)
+        if df['A_ID'].duplicated().any():
+            raise ValueError("Duplicate A_ID values in attendee data")
+        featurizer = AttendeeFeaturizer(weights).fit(df)
+        features = featurizer.transform(df)
+        neighbours, scores = knn_from_features(features, features, k, exclude=np.arange(len(df)))
+        return cls(df[['A_ID', 'Job_title', 'Specialization']], features, neighbours, scores, rosters, featurizer)
+
+    @classmethod
+    def load(cls, graph_dir=DEFAULT_GRAPH_DIR):
+        """
+        Load a persisted graph
+        """
+        if not os.path.isdir(graph_dir):
+            raise FileNotFoundError(f"Graph directory not found: {graph_dir}. Run attendee_matching.py build first.")
+        knn = np.load(os.path.join(graph_dir, "knn.npz"))
+        with open(os.path.join(graph_dir, "rosters.json"), "r") as f:
+            rosters = {normalize_event_id(event_id): roster for event_id, roster in json.load(f).items()}
+        featurizer = AttendeeFeaturizer.load(graph_dir)
+        return cls(
+            pd.read_csv(os.path.join(graph_dir, "attendees.csv"), keep_default_na=False),
+            sp.load_npz(os.path.join(graph_dir, "features.npz")).tocsr(),
+            knn['neighbours'],
+            knn['scores'],
+            rosters,
+            featurizer
+        )
+
+    def save(self, graph_dir=DEFAULT_GRAPH_DIR):
+        """
+        Persist the graph, rosters and vocabularies
+        """
+        os.makedirs(graph_dir, exist_ok=True)
+        sp.save_npz(os.path.join(graph_dir, "features.npz"), self.features)
+        np.savez(os.path.join(graph_dir, "knn.npz"), neighbours=self.neighbours, scores=self.scores)
+        self.attendees_df.to_csv(os.path.join(graph_dir, "attendees.csv"), index=False)
+        with open(os.path.join(graph_dir, "rosters.json"), "w") as f:
+            json.dump(self.rosters, f)
+        self.featurizer.save(graph_dir)
+
+    def _result(self, index, score, attendee_id):
+        row = self.attendees_df.iloc[index]
+        other_id = row['A_ID']
+        shared = self.attendee_events.get(attendee_id, set()) & self.attendee_events.get(other_id, set())
+        return {
+            "attendee_id": other_id,
+            "similarity_score": float(score),
+            "job_title": row['Job_title'],
+            "specialization": row['Specialization'],
+            "shared_events": sorted(shared)
+        }
+
+    def people_to_meet(self, attendee_id, event_id=None, top_k=10):
+        """
+        Find the most compatible co-attendees for an attendee
+
+        Parameters:
+        - attendee_id: A_ID from processed_data.csv (case-insensitive)
+        - event_id: Optional event id; only attendees on its roster are returned
+        - top_k: Number of people to return; above the graph's k, all
+          attendees are scored directly
+
+        Returns:
+        - list: Dictionaries with attendee_id, similarity_score, job_title,
+          specialization and shared_events, best match first
+        """
+        attendee_id = normalize_attendee_id(attendee_id)
+        if attendee_id not in self.id_to_index:
+            raise KeyError(f"Unknown attendee: {attendee_id}")
+        index = self.id_to_index[attendee_id]
+
+        if event_id is None:
+            if top_k <= self.k:
+                neighbours, scores = self.neighbours[index], self.scores[index]
+            else:
+                # The graph only keeps k neighbours; score everyone directly
+                neighbours, scores = knn_from_features(self.features[index], self.features, top_k, exclude=np.array([index]))
+                neighbours, scores = neighbours[0], scores[0]
+            pairs = [(n, s) for n, s in zip(neighbours, scores) if n >= 0]
+            return [self._result(n, s, attendee_id) for n, s in pairs[:top_k]]
+
+        event_id = normalize_event_id(event_id)
+        if event_id not in self.rosters:
+            raise KeyError(f"Unknown event: {event_id}")
+        roster = {self.id_to_index[aid] for aid in self.rosters[event_id] if aid in self.id_to_index}
+        roster.discard(index)
+
+        # Answer from the graph when enough neighbours are on the roster
+        pairs = [(n, s) for n, s in zip(self.neighbours[index], self.scores[index]) if n in roster]
+        if len(pairs) < min(top_k, len(roster)):
+            # Otherwise score the (small) roster directly
+            candidates = np.fromiter(roster, dtype=np.int64)
+            roster_scores = (self.features[candidates] @ self.features[index].T).toarray().ravel()
+            order = np.argsort(-roster_scores)
+            pairs = [(candidates[i], roster_scores[i]) for i in order]
+
+        return [self._result(n, s, attendee_id) for n, s in pairs[:top_k]]
+
+    def add_attendees(self, attendees_df):
+        """
+        Add new attendees and update the kNN graph incrementally
+
+        New attendees are embedded with the existing vocabularies; existing
+        attendees only have their neighbour lists updated where a newcomer
+        beats their current k-th best match.
+        """
+        df = prepare_attendees(attendees_df)
+        duplicates = [aid for aid in df['A_ID'] if aid in self.id_to_index]
+        if duplicates or df['A_ID'].duplicated().any():
+            raise ValueError(f"Attendees already present: {duplicates or df['A_ID'][df['A_ID'].duplicated()].tolist()}")
+        if len(df) == 0:
+            return
+
+        n_old = self.features.shape[0]
+        new_features = self.featurizer.transform(df)
+        self.features = sp.vstack([self.features, new_features], format='csr')
+
+        # Neighbour lists for the newcomers, against everyone
+        new_neighbours, new_scores = knn_from_features(new_features, self.features, self.k, exclude=np.arange(n_old, n_old + len(df)))
+
+        # Newcomers may displace neighbours of existing attendees
+        cross = (self.features[:n_old] @ new_features.T).toarray()
+        if n_old:
+            merged_neighbours = np.hstack([self.neighbours, np.arange(n_old, n_old + len(df), dtype=np.int32)[None, :].repeat(n_old, axis=0)])
+            merged_scores = np.hstack([self.scores, cross.astype(np.float32)])
+            order = np.argsort(-merged_scores, axis=1)[:, :self.k]
+            self.neighbours = np.take_along_axis(merged_neighbours, order, axis=1)
+            self.scores = np.take_along_axis(merged_scores, order, axis=1)
+            self.neighbours[~np.isfinite(self.scores)] = -1
+
+        self.neighbours = np.vstack([self.neighbours, new_neighbours])
+        self.scores = np.vstack([self.scores, new_scores])
+        self.attendees_df = pd.concat([self.attendees_df, df[['A_ID', 'Job_title', 'Specialization']]], ignore_index=True)
+        for i, aid in enumerate(df['A_ID']):
+            self.id_to_index[aid] = n_old + i
+
+    def add_attendance(self, pairs_df):
+        """
+        Add event-attendee rows (columns event_id, attendee_id) to the rosters
+        """
+        pairs_df = pairs_df.copy()
+        pairs_df.columns = [col.strip().lower() for col in pairs_df.columns]
+        for event_id, attendee_id in zip(pairs_df['event_id'], pairs_df['attendee_id']):
+            event_id = normalize_event_id(event_id)
+            attendee_id = normalize_attendee_id(attendee_id)
+            roster = self.rosters.setdefault(event_id, [])
+            if attendee_id not in roster:
+                roster.append(attendee_id)
+                self.attendee_events.setdefault(attendee_id, set()).add(event_id)
+
+
+def build_match_index(attendees_path="processed_data.csv",
+                      pairs_paths=("event_attendee_pairs.csv", "event_attendee_pairs_future.csv"),
+                      graph_dir=DEFAULT_GRAPH_DIR, k=20, verbose=False):
+    """
+    Build the attendee kNN graph and rosters and save them to graph_dir
+
+    Returns:
+    - AttendeeMatcher: The built matcher
+    """
+    if verbose:
+        print(f"Loading attendees from {attendees_path}")
+    attendees_df = pd.read_csv(attendees_path)
+    rosters = load_rosters(pairs_paths)
+    if verbose:
+        print(f"Loaded {len(attendees_df)} attendees and {len(rosters)} event rosters")
+
+    matcher = AttendeeMatcher.build(attendees_df, rosters, k=k)
+    matcher.save(graph_dir)
+    if verbose:
+        print(f"Saved {k}-NN graph for {len(matcher.attendees_df)} attendees to {graph_dir}")
+    return matcher
+
+
+def format_matches_for_display(attendee_id, matches, event_id=None):
+    """
+    Format matches as markdown text
+    """
+    where = f" at event {event_id}" if event_id else ""
+    output = f"# People to meet for {attendee_id}{where}\n\n"
+    for i, match in enumerate(matches, 1):
+        output += f"## {i}. {match['attendee_id']} ({match['job_title']}, {match['specialization']})\n"
+        output += f"**Compatibility:** {match['similarity_score']:.3f}\n"
+        if match['shared_events']:
+            output += f"**Shared events:** {', '.join(match['shared_events'])}\n"
+        output += "\n"
+    return output
+
+
+def main():
+    """
+    Command-line interface
+    """
+    parser = argparse.ArgumentParser(description='Attendee people-to-meet matching')
+    parser.add_argument('command', choices=['build', 'match', 'add-attendees', 'add-attendance'], help='Action to run')
+    parser.add_argument('--graph-dir', type=str, default=DEFAULT_GRAPH_DIR, help='Graph directory')
+    parser.add_argument('--attendee', type=str, help='Attendee id (A_ID) for match')
+    parser.add_argument('--event', type=str, help='Optional event id for match')
+    parser.add_argument('--top', type=int, default=10, help='Number of people to return (default: 10)')
+    parser.add_argument('--k', type=int, default=20, help='Neighbours kept per attendee by build (default: 20)')
+    parser.add_argument('--input', type=str, help='CSV of attendees or event-attendee pairs for add-*')
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help='Output format: text (markdown) or json')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'build':
+            build_match_index(graph_dir=args.graph_dir, k=args.k, verbose=True)
+            return 0
+
+        matcher = AttendeeMatcher.load(args.graph_dir)
+
+        if args.command == 'match':
+            if not args.attendee:
+                print("Please provide --attendee for match")
+                return 1
+            attendee_id = normalize_attendee_id(args.attendee)
+            event_id = normalize_event_id(args.event) if args.event else None
+            matches = matcher.people_to_meet(attendee_id, event_id, args.top)
+            if args.format == 'json':
+                print(json.dumps({"attendee_id": attendee_id, "event_id": event_id, "matches": matches}, indent=2))
+            else:
+                print(format_matches_for_display(attendee_id, matches, event_id))
+            return 0
+
+        if not args.input:
+            print(f"Please provide --input for {args.command}")
+            return 1
+        if args.command == 'add-attendees':
+            matcher.add_attendees(pd.read_csv(args.input))
+        else:
+            matcher.add_attendance(pd.read_csv(args.input))
+        matcher.save(args.graph_dir)
+        print(f"Updated graph in {args.graph_dir}")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        traceback.print_exc()
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
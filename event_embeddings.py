@@ -5,19 +5,31 @@ import cohere
 import traceback
 from dotenv import load_dotenv
 
-# Load environment variables
-print("Loading environment variables...")
-load_dotenv()
+_co = None
 
-# Initialize Cohere client
-print("Initializing Cohere client...")
-COHERE_API_KEY = os.getenv("COHERE_API_KEY")
-if not COHERE_API_KEY:
-    raise ValueError("COHERE_API_KEY environment variable not set. Please set it in a .env file.")
-else:
-    print(f"COHERE_API_KEY found with length: {len(COHERE_API_KEY)}")
-
-co = cohere.Client(COHERE_API_KEY)
+def get_cohere_client():
+    """
+    Load environment variables and create the Cohere client on first use
+    
+    This is not done at import time, so processes that only import this module
+    (such as spawned shard workers) do not need the API key or print the banners.
+    """
+    global _co
+    if _co is None:
+        # Load environment variables
+        print("Loading environment variables...")
+        load_dotenv()
+        
+        # Initialize Cohere client
+        print("Initializing Cohere client...")
+        COHERE_API_KEY = os.getenv("COHERE_API_KEY")
+        if not COHERE_API_KEY:
+            raise ValueError("COHERE_API_KEY environment variable not set. Please set it in a .env file.")
+        else:
+            print(f"COHERE_API_KEY found with length: {len(COHERE_API_KEY)}")
+        
+        _co = cohere.Client(COHERE_API_KEY)
+    return _co
 
 def load_and_preprocess_events(csv_path):
     """
@@ -83,7 +95,7 @@ def generate_embeddings(texts, model="embed-english-v3.0"):
         print(f"Processing batch {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1}, size: {len(batch)}")
         
         try:
-            response = co.embed(
+            response = get_cohere_client().embed(
                 texts=batch,
                 model=model,
                 input_type="search_document"
@@ -104,7 +116,7 @@ def embed_user_query(query, model="embed-english-v3.0"):
     print(f"Generating embedding for user query: '{query}'")
     
     try:
-        response = co.embed(
+        response = get_cohere_client().embed(
             texts=[query],
             model=model,
             input_type="search_query"
@@ -2,9 +2,11 @@ import os
 import sys
 import json
 import argparse
+from event_embeddings import get_cohere_client
 from prompted_filtering_file import llm_filter_events
+from sharded_retrieval import ShardCoordinator
 
-def process_input_text(input_text, top_n=3, format_type="text", verbose=False):
+def process_input_text(input_text, top_n=3, format_type="text", verbose=False, coordinator=None):
     """
     Process input text to get event recommendations
     
@@ -13,6 +15,7 @@ def process_input_text(input_text, top_n=3, format_type="text", verbose=False):
     - top_n (int): Number of events to return
     - format_type (str): Output format ("text" or "json")
     - verbose (bool): Whether to show detailed logs
+    - coordinator (ShardCoordinator, optional): Sharded event index to search
     
     Returns:
     - str: Formatted recommendations or JSON string
@@ -26,7 +29,8 @@ def process_input_text(input_text, top_n=3, format_type="text", verbose=False):
             user_summary=input_text,
             top_n=top_n,
             output_format=format_type,
-            verbose=verbose
+            verbose=verbose,
+            coordinator=coordinator
         )
         
         return results
@@ -39,7 +43,7 @@ def process_input_text(input_text, top_n=3, format_type="text", verbose=False):
         
         return error_msg if format_type == "text" else json.dumps({"error": error_msg})
 
-def process_from_file(input_file, output_file=None, top_n=3, format_type="text", verbose=False):
+def process_from_file(input_file, output_file=None, top_n=3, format_type="text", verbose=False, coordinator=None):
     """
     Process user preferences from a file and optionally write results to another file
     
@@ -49,6 +53,7 @@ def process_from_file(input_file, output_file=None, top_n=3, format_type="text",
     - top_n (int): Number of events to return
     - format_type (str): Output format ("text" or "json")
     - verbose (bool): Whether to show detailed logs
+    - coordinator (ShardCoordinator, optional): Sharded event index to search
     
     Returns:
     - str: Formatted recommendations or JSON string
@@ -62,7 +67,7 @@ def process_from_file(input_file, output_file=None, top_n=3, format_type="text",
             input_text = f.read().strip()
         
         # Process the input
-        results = process_input_text(input_text, top_n, format_type, verbose)
+        results = process_input_text(input_text, top_n, format_type, verbose, coordinator)
         
         # Write to output file if specified
         if output_file:
@@ -92,7 +97,7 @@ def process_from_file(input_file, output_file=None, top_n=3, format_type="text",
         
         return error_msg if format_type == "text" else json.dumps({"error": error_msg})
 
-def get_top_events_for_user(user_text, count=3, output_format="text", verbose=False):
+def get_top_events_for_user(user_text, count=3, output_format="text", verbose=False, coordinator=None):
     """
     Simple function to get top events for a user preference text
     
@@ -101,11 +106,12 @@ def get_top_events_for_user(user_text, count=3, output_format="text", verbose=Fa
     - count (int): Number of events to return (default: 3)
     - output_format (str): Output format ("text" or "json")
     - verbose (bool): Show detailed logs
+    - coordinator (ShardCoordinator, optional): Sharded event index to search
     
     Returns:
     - str: Formatted recommendations or JSON string
     """
-    return process_input_text(user_text, count, output_format, verbose)
+    return process_input_text(user_text, count, output_format, verbose, coordinator)
 
 def main():
     """
@@ -118,6 +124,7 @@ def main():
     parser.add_argument('--events', type=int, default=3, help='Number of events to return (default: 3)')
     parser.add_argument('--format', choices=['text', 'json'], default='text', help='Output format: text (markdown) or json')
     parser.add_argument('--verbose', action='store_true', help='Show detailed logs')
+    parser.add_argument('--shard-dir', type=str, default=os.getenv("EVENT_SHARD_DIR"), help='Search a sharded event index (see sharded_retrieval.py) instead of event_embeddings.npy. Each run starts one worker per shard and copies it into shared memory, so for a single query this is slower than the in-process scan; sharding pays off with a long-lived ShardCoordinator serving many queries')
     
     args = parser.parse_args()
     
@@ -126,22 +133,40 @@ def main():
         print("Please provide either --text or --input parameter")
         return 1
     
-    # Process based on input method
-    if args.text:
-        results = process_input_text(
-            args.text, 
-            args.events, 
-            args.format, 
-            args.verbose
-        )
-    else:
-        results = process_from_file(
-            args.input, 
-            args.output, 
-            args.events, 
-            args.format, 
-            args.verbose
-        )
+    coordinator = None
+    try:
+        if args.shard_dir:
+            try:
+                coordinator = ShardCoordinator(args.shard_dir, verbose=args.verbose)
+            except Exception as e:
+                error_msg = f"Error opening event shards: {str(e)}"
+                if args.verbose:
+                    import traceback
+                    traceback.print_exc()
+                print(error_msg if args.format == "text" else json.dumps({"error": error_msg}))
+                return 1
+        
+        # Process based on input method
+        if args.text:
+            results = process_input_text(
+                args.text, 
+                args.events, 
+                args.format, 
+                args.verbose,
+                coordinator
+            )
+        else:
+            results = process_from_file(
+                args.input, 
+                args.output, 
+                args.events, 
+                args.format, 
+                args.verbose,
+                coordinator
+            )
+    finally:
+        if coordinator is not None:
+            coordinator.close()
     
     # Output results if no output file specified
     if not args.output:
@@ -150,4 +175,6 @@ def main():
     return 0
 
 if __name__ == "__main__":
+    # Create the Cohere client up front so a missing API key fails immediately
+    get_cohere_client()
     sys.exit(main()) 
\ No newline at end of file
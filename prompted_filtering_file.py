@@ -1,28 +1,13 @@
 import numpy as np
 import pandas as pd
-import cohere
 import os
 import json
 import re
 import sys
 import argparse
 import traceback
-from dotenv import load_dotenv
-from event_embeddings import embed_user_query
-
-# Load environment variables
-print("Loading environment variables...")
-load_dotenv()
-
-# Initialize Cohere client
-print("Initializing Cohere client...")
-COHERE_API_KEY = os.getenv("COHERE_API_KEY")
-if not COHERE_API_KEY:
-    raise ValueError("COHERE_API_KEY environment variable not set. Please set it in a .env file.")
-else:
-    print(f"COHERE_API_KEY found with length: {len(COHERE_API_KEY)}")
-
-co = cohere.Client(COHERE_API_KEY)
+from event_embeddings import embed_user_query, get_cohere_client
+from sharded_retrieval import ShardCoordinator
 
 def cosine_similarity(embedding1, embedding2):
     """
@@ -30,9 +15,29 @@ def cosine_similarity(embedding1, embedding2):
     """
     return np.dot(embedding1, embedding2) / (np.linalg.norm(embedding1) * np.linalg.norm(embedding2))
 
-def get_top_similar_events(user_summary, top_n=10, verbose=False):
+def build_event_result(event_data, similarity, fallback_id=""):
+    """
+    Convert an event row and its similarity score into a result dictionary
+    """
+    return {
+        "event_id": event_data.get("event_id", fallback_id),
+        "event_name": event_data.get("event name", ""),
+        "date": event_data.get("date", ""),
+        "similarity_score": float(similarity),
+        "topics": f"{event_data.get('Key topic 1', '')} {event_data.get('Key topic 2', '')} {event_data.get('Key topic 3', '')}".strip(),
+        "location": event_data.get("location", ""),
+        "summary": event_data.get("event summary", ""),
+        "event_text": event_data.get("event_text", "")
+    }
+
+def get_top_similar_events(user_summary, top_n=10, verbose=False, coordinator=None):
     """
     Find top N events most similar to the user summary based on embeddings
+    
+    If a sharded_retrieval.ShardCoordinator is passed, the query is scattered
+    across its shard workers instead of scoring event_embeddings.npy in-process.
+    Starting a coordinator costs one process and a shared-memory copy per shard,
+    so it should be created once and reused across many queries.
     """
     if verbose:
         print(f"Finding events similar to user summary: '{user_summary}'")
@@ -48,6 +53,20 @@ def get_top_similar_events(user_summary, top_n=10, verbose=False):
             traceback.print_exc()
         return None
     
+    # Query the sharded index if a coordinator is running
+    if coordinator is not None:
+        try:
+            if verbose:
+                print(f"Querying {len(coordinator.shards)} event shards...")
+            matches = coordinator.query(user_embedding, top_n)
+        except Exception as e:
+            if verbose:
+                print(f"Error querying event shards: {str(e)}")
+                traceback.print_exc()
+            return None
+        # Rows are shard-local, so there is no positional fallback id here
+        return [build_event_result(event_data, similarity) for similarity, event_data in matches]
+    
     # Load event embeddings and events data
     try:
         if verbose:
@@ -83,18 +102,7 @@ def get_top_similar_events(user_summary, top_n=10, verbose=False):
         print(f"Getting top {top_n} results...")
     top_results = []
     for i, similarity in similarities[:top_n]:
-        event_data = events_df.iloc[i]
-        result = {
-            "event_id": event_data.get("event_id", f"Event {i}"),
-            "event_name": event_data.get("event name", ""),
-            "date": event_data.get("date", ""),
-            "similarity_score": float(similarity),
-            "topics": f"{event_data.get('Key topic 1', '')} {event_data.get('Key topic 2', '')} {event_data.get('Key topic 3', '')}".strip(),
-            "location": event_data.get("location", ""),
-            "summary": event_data.get("event summary", ""),
-            "event_text": event_data.get("event_text", "")
-        }
-        top_results.append(result)
+        top_results.append(build_event_result(events_df.iloc[i], similarity, f"Event {i}"))
     
     return top_results
 
@@ -182,7 +190,7 @@ def get_recommendations_json(results):
         "user_summary": results["user_summary"]
     })
 
-def llm_filter_events(user_summary, top_n=5, output_format="text", verbose=False):
+def llm_filter_events(user_summary, top_n=5, output_format="text", verbose=False, coordinator=None):
     """
     Main function to filter events using embeddings and LLM
     
@@ -191,13 +199,14 @@ def llm_filter_events(user_summary, top_n=5, output_format="text", verbose=False
     - top_n: Number of events to consider (default 5)
     - output_format: 'text' for markdown formatting, 'json' for API responses
     - verbose: Whether to print detailed logs
+    - coordinator: Optional sharded_retrieval.ShardCoordinator to search with
     
     Returns:
     - Formatted string (text mode) or JSON string (json mode)
     """
     try:
         # Step 1: Get top N similar events based on embeddings
-        top_events = get_top_similar_events(user_summary, top_n, verbose)
+        top_events = get_top_similar_events(user_summary, top_n, verbose, coordinator)
         if not top_events:
             return "No matching events found" if output_format == "text" else json.dumps({"error": "No matching events found"})
         
@@ -213,7 +222,7 @@ def llm_filter_events(user_summary, top_n=5, output_format="text", verbose=False
         if verbose:
             print("\nCalling Cohere's generate API...")
         try:
-            response = co.generate(
+            response = get_cohere_client().generate(
                 prompt=prompt,
                 max_tokens=800,
                 temperature=0.3,
@@ -273,7 +282,7 @@ Relevance Score: 75"""
             traceback.print_exc()
         return "Error processing recommendations" if output_format == "text" else json.dumps({"error": str(e)})
 
-def process_from_file(input_file, output_file, verbose=True):
+def process_from_file(input_file, output_file, verbose=True, coordinator=None):
     """
     Process a user summary from a file and write results to another file
     """
@@ -288,7 +297,7 @@ def process_from_file(input_file, output_file, verbose=True):
             print(f"User summary: {user_summary}")
         
         # Get event recommendations
-        results = llm_filter_events(user_summary, top_n=5, output_format="text", verbose=verbose)
+        results = llm_filter_events(user_summary, top_n=5, output_format="text", verbose=verbose, coordinator=coordinator)
         
         # Write to output file
         if verbose:
@@ -324,6 +333,7 @@ def main():
     parser.add_argument('--format', choices=['text', 'json'], default='text', help='Output format: text (markdown) or json')
     parser.add_argument('--events', type=int, default=5, help='Number of events to consider')
     parser.add_argument('--quiet', action='store_true', help='Suppress verbose output')
+    parser.add_argument('--shard-dir', type=str, default=os.getenv("EVENT_SHARD_DIR"), help='Search a sharded event index (see sharded_retrieval.py) instead of event_embeddings.npy. Each run starts one worker per shard and copies it into shared memory, so for a single query this is slower than the in-process scan; sharding pays off with a long-lived ShardCoordinator serving many queries')
     
     args = parser.parse_args()
     verbose = not args.quiet
@@ -356,7 +366,16 @@ def main():
         return 1
     
     # Get recommendations
-    result = llm_filter_events(user_summary, top_n=args.events, output_format=args.format, verbose=verbose)
+    if args.shard_dir:
+        try:
+            with ShardCoordinator(args.shard_dir, verbose=verbose) as coordinator:
+                result = llm_filter_events(user_summary, top_n=args.events, output_format=args.format, verbose=verbose, coordinator=coordinator)
+        except Exception as e:
+            error_msg = f"Error opening event shards: {str(e)}"
+            print(error_msg if args.format == "text" else json.dumps({"error": error_msg}))
+            return 1
+    else:
+        result = llm_filter_events(user_summary, top_n=args.events, output_format=args.format, verbose=verbose)
     
     # Output the results
     if args.output == "stdout" or not args.output:
@@ -374,10 +393,19 @@ def main():
     return 0
 
 # For backwards compatibility with the web_interface.py
+# Set EVENT_SHARD_DIR to search a sharded event index (only worthwhile when the
+# process serves many requests; see --shard-dir)
 def process_legacy():
-    process_from_file("user_summary.txt", "recommendations.txt")
+    shard_dir = os.getenv("EVENT_SHARD_DIR")
+    if shard_dir:
+        with ShardCoordinator(shard_dir) as coordinator:
+            process_from_file("user_summary.txt", "recommendations.txt", coordinator=coordinator)
+    else:
+        process_from_file("user_summary.txt", "recommendations.txt")
 
 if __name__ == "__main__":
+    # Create the Cohere client up front so a missing API key fails immediately
+    get_cohere_client()
     if len(sys.argv) > 1:
         sys.exit(main())
     else:
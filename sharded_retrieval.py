@@ -0,0 +1,383 @@
+"""
+Sharded Event Retrieval
+-----------------------
+This script splits the event embedding index into shards and serves them from
+worker processes, so that similarity search can use every core and old event
+years can be aged out without rebuilding the whole index.
+
+Layout on disk (one directory per shard):
+    event_shards/
+        2024/
+            embeddings.npy   (L2-normalised event embeddings)
+            events.csv       (matching rows of processed_events.csv)
+        2025/
+            ...
+
+Key pieces:
+1. build_shards - partition event_embeddings.npy / processed_events.csv by
+   date year, by city or by country (parts of the location)
+2. ShardCoordinator - loads each shard into shared memory, starts one worker
+   process per shard, scatters queries and merges the per-shard top-k with a heap
+3. add_shard / retire_shard - bring a shard online or drop it while the other
+   shards keep serving
+"""
+
+import os
+import sys
+import heapq
+import shutil
+import argparse
+import threading
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SHARD_DIR = "event_shards"
+EMBEDDINGS_FILE = "embeddings.npy"
+CATALOG_FILE = "events.csv"
+
+
+def normalize_embeddings(embeddings):
+    """
+    L2-normalise embeddings row-wise so that a dot product is a cosine similarity
+    """
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def shard_key(row, by="year"):
+    """
+    Get the shard name for an event row
+
+    Parameters:
+    - row: Row of processed_events.csv
+    - by: 'year' to partition on the event date, 'region' (or 'city') to
+      partition on the city part of the location ("Toronto, Canada" -> "toronto"),
+      'country' to partition on the country part ("Toronto, Canada" -> "canada")
+    """
+    if by == "year":
+        date = str(row.get("date", "")).strip()
+        return date[:4] if date[:4].isdigit() else "undated"
+    if by in ("region", "city", "country"):
+        parts = str(row.get("location", "")).split(",")
+        part = parts[-1] if by == "country" else parts[0]
+        region = part.strip().lower().replace(" ", "_")
+        return region or "unknown"
+    raise ValueError(f"Unknown shard partition: {by}")
+
+
+def write_shard(shard_path, embeddings, events_df):
+    """
+    Write one shard (embeddings + event catalog) to a directory
+    """
+    if len(embeddings) != len(events_df):
+        raise ValueError(f"Shard {shard_path} has {len(embeddings)} embeddings but {len(events_df)} events")
+    os.makedirs(shard_path, exist_ok=True)
+    np.save(os.path.join(shard_path, EMBEDDINGS_FILE), normalize_embeddings(embeddings))
+    events_df.to_csv(os.path.join(shard_path, CATALOG_FILE), index=False)
+
+
+def build_shards(embeddings_path="event_embeddings.npy", events_path="processed_events.csv",
+                 shard_dir=DEFAULT_SHARD_DIR, by="year", verbose=False):
+    """
+    Partition the single embedding index into shards
+
+    Parameters:
+    - embeddings_path: Output of event_embeddings.py
+    - events_path: Event catalog matching the embeddings row for row
+    - shard_dir: Directory that will hold one sub-directory per shard
+    - by: 'year', 'region'/'city' or 'country'
+    - verbose: Whether to print detailed logs
+
+    Returns:
+    - list: Names of the shards written
+    """
+    embeddings = np.load(embeddings_path)
+    events_df = pd.read_csv(events_path)
+    if len(embeddings) != len(events_df):
+        raise ValueError(f"{embeddings_path} has {len(embeddings)} rows but {events_path} has {len(events_df)}")
+
+    keys = events_df.apply(lambda row: shard_key(row, by), axis=1)
+    shard_names = []
+    for name in sorted(keys.unique()):
+        mask = (keys == name).to_numpy()
+        write_shard(os.path.join(shard_dir, name), embeddings[mask], events_df[mask].reset_index(drop=True))
+        shard_names.append(name)
+        if verbose:
+            print(f"Wrote shard '{name}' with {int(mask.sum())} events")
+
+    return shard_names
+
+
+def _shard_worker(conn, shm_name, shape, dtype):
+    """
+    Worker process: attach to a shard's shared-memory embeddings and answer
+    (queries, top_n) requests with per-query lists of (score, row) pairs
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        embeddings = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            queries, top_n = request
+            try:
+                scores = queries @ embeddings.T
+                k = min(top_n, scores.shape[1])
+                results = []
+                for row_scores in scores:
+                    if k == 0:
+                        results.append([])
+                        continue
+                    top = np.argpartition(-row_scores, k - 1)[:k]
+                    results.append([(float(row_scores[i]), int(i)) for i in top])
+                conn.send(results)
+            except Exception as e:
+                conn.send(e)
+    finally:
+        del embeddings
+        shm.close()
+        conn.close()
+
+
+class _Shard:
+    """
+    A loaded shard: its catalog, shared-memory block and worker process
+    """
+
+    def __init__(self, name, path, ctx):
+        self.name = name
+        self.path = path
+        self.events_df = pd.read_csv(os.path.join(path, CATALOG_FILE))
+
+        # Normalise on load too: shards added from elsewhere may not be normalised
+        embeddings = np.ascontiguousarray(normalize_embeddings(np.load(os.path.join(path, EMBEDDINGS_FILE))))
+        if len(embeddings) != len(self.events_df):
+            raise ValueError(f"Shard '{name}' has {len(embeddings)} embeddings but {len(self.events_df)} events")
+        self.size = len(embeddings)
+        self.dim = embeddings.shape[1] if embeddings.ndim == 2 else 0
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(embeddings.nbytes, 1))
+        np.ndarray(embeddings.shape, dtype=embeddings.dtype, buffer=self.shm.buf)[:] = embeddings
+
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_shard_worker,
+            args=(child_conn, self.shm.name, embeddings.shape, embeddings.dtype),
+            name=f"shard-{name}",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.shm.close()
+        self.shm.unlink()
+
+
+class ShardCoordinator:
+    """
+    Scatter-gather coordinator over a directory of event shards
+
+    Queries are serialised with a lock, so one coordinator can be shared
+    between threads. A shard whose worker dies is retired on the next query
+    (which raises RuntimeError); the remaining shards keep serving.
+
+    Example:
+        with ShardCoordinator("event_shards") as coordinator:
+            results = coordinator.query(user_embedding, top_n=10)
+            for score, event_data in results:
+                print(event_data["event name"], score)
+    """
+
+    def __init__(self, shard_dir=DEFAULT_SHARD_DIR, verbose=False):
+        self.shard_dir = shard_dir
+        self.verbose = verbose
+        self.shards = {}
+        self._ctx = mp.get_context("spawn")
+        # One pipe per shard: requests and replies must not interleave between threads
+        self._lock = threading.RLock()
+
+        if not os.path.isdir(shard_dir):
+            raise FileNotFoundError(f"Shard directory not found: {shard_dir}. Run sharded_retrieval.py build first.")
+        try:
+            for name in sorted(os.listdir(shard_dir)):
+                if os.path.exists(os.path.join(shard_dir, name, EMBEDDINGS_FILE)):
+                    self.add_shard(name)
+        except Exception:
+            # __exit__ will not run: stop the workers already started
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def add_shard(self, name, path=None):
+        """
+        Bring a shard online without touching the others
+
+        Parameters:
+        - name: Shard name (e.g. '2026')
+        - path: Shard directory, defaults to <shard_dir>/<name>
+        """
+        with self._lock:
+            if name in self.shards:
+                raise ValueError(f"Shard '{name}' is already loaded")
+            shard = _Shard(name, path or os.path.join(self.shard_dir, name), self._ctx)
+            dims = {s.dim for s in self.shards.values() if s.size}
+            if shard.size and dims and shard.dim not in dims:
+                shard.close()
+                raise ValueError(f"Shard '{name}' has embedding dimension {shard.dim}, expected {dims.pop()}")
+            self.shards[name] = shard
+        if self.verbose:
+            print(f"Loaded shard '{name}' with {shard.size} events")
+
+    def retire_shard(self, name, delete=False):
+        """
+        Stop serving a shard, e.g. when a year's events expire
+
+        Parameters:
+        - name: Shard name
+        - delete: Also remove the shard directory from disk
+        """
+        with self._lock:
+            shard = self.shards.pop(name, None)
+            if shard is None:
+                raise KeyError(f"Shard '{name}' is not loaded")
+            shard.close()
+        if delete:
+            shutil.rmtree(shard.path)
+        if self.verbose:
+            print(f"Retired shard '{name}'")
+
+    def query_batch(self, query_embeddings, top_n=10):
+        """
+        Find the top N events for each query across all shards
+
+        Returns:
+        - list: One list per query of (similarity_score, event_data) pairs,
+          highest score first
+        """
+        queries = normalize_embeddings(query_embeddings)
+
+        with self._lock:
+            shards = list(self.shards.values())
+            pending = []
+            responses = {}
+            failed = []
+            try:
+                # Scatter: every worker scores its shard in parallel
+                for shard in shards:
+                    try:
+                        shard.conn.send((queries, top_n))
+                        pending.append(shard)
+                    except (BrokenPipeError, EOFError, OSError) as e:
+                        failed.append((shard, e))
+
+                # Gather: read a reply from every shard that was sent a request,
+                # so no stale reply is left in a pipe for the next query
+                while pending:
+                    shard = pending[0]
+                    try:
+                        responses[shard.name] = shard.conn.recv()
+                    except (BrokenPipeError, EOFError, OSError) as e:
+                        failed.append((shard, e))
+                    pending.pop(0)
+            finally:
+                # A pipe that was not drained (interrupted gather) or whose worker
+                # died is out of sync; take the shard out of service
+                for shard in pending:
+                    failed.append((shard, "request interrupted"))
+                for shard, _ in failed:
+                    if self.shards.get(shard.name) is shard:
+                        self.retire_shard(shard.name)
+
+        errors = [f"{shard.name}: worker failed ({error})" for shard, error in failed]
+        errors += [f"{name}: {response}" for name, response in responses.items() if isinstance(response, Exception)]
+        if errors:
+            raise RuntimeError(f"Shard query failed ({'; '.join(errors)})")
+
+        per_query = [[] for _ in range(len(queries))]
+        for shard in shards:
+            for q, hits in enumerate(responses[shard.name]):
+                per_query[q].extend((score, shard, row) for score, row in hits)
+
+        # Merge with a heap
+        results = []
+        for hits in per_query:
+            top = heapq.nlargest(top_n, hits, key=lambda hit: hit[0])
+            results.append([(score, shard.events_df.iloc[row]) for score, shard, row in top])
+        return results
+
+    def query(self, query_embedding, top_n=10):
+        """
+        Find the top N events for a single query embedding
+        """
+        return self.query_batch([query_embedding], top_n)[0]
+
+    def close(self):
+        """
+        Stop all workers and release shared memory
+        """
+        with self._lock:
+            for name in list(self.shards):
+                self.retire_shard(name)
+
+
+def main():
+    """
+    Command-line interface for managing shards
+    """
+    parser = argparse.ArgumentParser(description='Sharded event retrieval')
+    parser.add_argument('command', choices=['build', 'list', 'retire'], help='build shards, list shards, or retire (delete) a shard')
+    parser.add_argument('--shard-dir', type=str, default=DEFAULT_SHARD_DIR, help='Shard directory')
+    parser.add_argument('--by', choices=['year', 'region', 'city', 'country'], default='year', help='Partition used by build: year, region/city or country (default: year)')
+    parser.add_argument('--embeddings', type=str, default='event_embeddings.npy', help='Embeddings used by build')
+    parser.add_argument('--events', type=str, default='processed_events.csv', help='Event catalog used by build')
+    parser.add_argument('--name', type=str, help='Shard name for retire')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'build':
+            names = build_shards(args.embeddings, args.events, args.shard_dir, args.by, verbose=True)
+            print(f"Built {len(names)} shards in {args.shard_dir}")
+        elif args.command == 'list':
+            for name in sorted(os.listdir(args.shard_dir)):
+                catalog = os.path.join(args.shard_dir, name, CATALOG_FILE)
+                if os.path.exists(catalog):
+                    print(f"{name}: {len(pd.read_csv(catalog))} events")
+        else:
+            if not args.name:
+                print("Please provide --name for retire")
+                return 1
+            shutil.rmtree(os.path.join(args.shard_dir, args.name))
+            print(f"Retired shard '{args.name}'")
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        traceback.print_exc()
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Tests for attendee_matching.py using a small in-memory attendee table
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from attendee_matching import AttendeeFeaturizer, AttendeeMatcher, knn_from_features, load_rosters, prepare_attendees
+
+JOBS = ["data analyst", "data scientist", "sub editor", "software engineer", "business consultant"]
+SPECIALIZATIONS = ["statistics", "computer science", "journalism", "physics", "business administration"]
+SKILLS = ["python", "sql", "writing", "leadership", "machine learning", "sales", "research"]
+INTERESTS = ["ai", "news coverage", "entrepreneurship", "healthtech", "design"]
+
+
+def make_attendees(n, start=1, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(start, start + n):
+        rows.append({
+            "A_ID": f"A{i}",
+            "Education": rng.choice(["B.Sc", "M.Sc", "B.Tech", "MBA"]),
+            "Specialization": rng.choice(SPECIALIZATIONS),
+            "Job_title": rng.choice(JOBS),
+            "processed_skills": str(sorted(rng.choice(SKILLS, size=3, replace=False).tolist())),
+            "processed_interests": str(sorted(rng.choice(INTERESTS, size=2, replace=False).tolist())),
+        })
+    return pd.DataFrame(rows)
+
+
+def brute_force(matcher, attendee_id, candidates=None):
+    """
+    All (attendee_id, score) pairs for an attendee, best first
+    """
+    index = matcher.id_to_index[attendee_id]
+    scores = (matcher.features @ matcher.features[index].T).toarray().ravel()
+    ids = matcher.attendees_df["A_ID"].tolist()
+    pairs = [(ids[i], scores[i]) for i in range(len(ids)) if i != index and (candidates is None or ids[i] in candidates)]
+    return sorted(pairs, key=lambda pair: -pair[1])
+
+
+def assert_scores(matches, expected):
+    assert len(matches) == len(expected)
+    assert np.allclose([m["similarity_score"] for m in matches], [score for _, score in expected], atol=1e-6)
+
+
+@pytest.fixture
+def matcher():
+    rosters = {"e1": ["A1", "A2", "A3", "A4", "A5", "A6"], "e2": ["A1", "A7", "A8"]}
+    return AttendeeMatcher.build(make_attendees(30), rosters, k=3)
+
+
+def test_knn_graph_matches_brute_force(matcher):
+    for attendee_id in ["A1", "A10", "A30"]:
+        assert_scores(matcher.people_to_meet(attendee_id, top_k=3), brute_force(matcher, attendee_id)[:3])
+
+
+def test_add_attendees_matches_rebuild(matcher):
+    matcher.add_attendees(make_attendees(10, start=31, seed=1))
+
+    _, scores = knn_from_features(matcher.features, matcher.features, matcher.k, exclude=np.arange(40))
+    assert np.allclose(matcher.scores, scores, atol=1e-6)
+    assert matcher.people_to_meet("A35", top_k=3)[0]["attendee_id"] != "A35"
+
+    with pytest.raises(ValueError):
+        matcher.add_attendees(make_attendees(1, start=5))
+
+
+def test_top_k_above_graph_k_scores_everyone(matcher):
+    matches = matcher.people_to_meet("A1", top_k=10)
+    assert_scores(matches, brute_force(matcher, "A1")[:10])
+    assert len(matcher.people_to_meet("A1", top_k=100)) == 29
+
+
+def test_event_roster_fallback(matcher):
+    # Roster larger than k: the graph alone cannot answer top_k=5
+    roster = set(matcher.rosters["e1"]) - {"A1"}
+    matches = matcher.people_to_meet("A1", event_id="e1", top_k=5)
+    assert {m["attendee_id"] for m in matches} <= roster
+    assert_scores(matches, brute_force(matcher, "A1", roster)[:5])
+    assert all("e1" in m["shared_events"] for m in matches)
+
+    with pytest.raises(KeyError):
+        matcher.people_to_meet("A1", event_id="e99")
+
+
+def test_id_normalisation(matcher, tmp_path):
+    assert matcher.people_to_meet(" a1 ", event_id=" E2 ", top_k=2) == matcher.people_to_meet("A1", event_id="e2", top_k=2)
+
+    matcher.add_attendance(pd.DataFrame({"event_id": ["E3", "e3"], "attendee_id": [" a9", "A10"]}))
+    assert matcher.rosters["e3"] == ["A9", "A10"]
+    assert [m["attendee_id"] for m in matcher.people_to_meet("a9", event_id="E3")] == ["A10"]
+
+    pairs_path = tmp_path / "pairs.csv"
+    pd.DataFrame({"Event_ID": ["E1", "e1"], "Attendee_ID": ["a1", "A1"]}).to_csv(pairs_path, index=False)
+    assert load_rosters([pairs_path]) == {"e1": ["A1"]}
+
+    with pytest.raises(KeyError):
+        matcher.people_to_meet("A999")
+
+
+def test_save_load_round_trip(matcher, tmp_path):
+    matcher.save(tmp_path / "graph")
+    assert not list((tmp_path / "graph").glob("*.pkl"))
+    loaded = AttendeeMatcher.load(tmp_path / "graph")
+
+    # Vectorizers rebuilt from vocabularies.json / idf.npz embed exactly like the fitted ones
+    df = prepare_attendees(make_attendees(30))
+    assert abs(loaded.featurizer.transform(df) - matcher.featurizer.transform(df)).max() < 1e-7
+    assert abs(loaded.features - matcher.features).max() == 0
+    assert loaded.rosters == matcher.rosters
+    assert loaded.people_to_meet("A1", event_id="e1", top_k=4) == matcher.people_to_meet("A1", event_id="e1", top_k=4)
+
+    # A loaded graph can still grow
+    loaded.add_attendees(make_attendees(2, start=31, seed=2))
+    assert loaded.people_to_meet("A31", top_k=2)
+
+
+def test_featurizer_weights_sum_to_cosine():
+    df = prepare_attendees(make_attendees(30))
+    features = AttendeeFeaturizer().fit(df).transform(df)
+    # Each block is unit length and scaled by sqrt(weight): self-similarity is the
+    # sum of the weights of the blocks an attendee has terms in
+    assert features.multiply(features).sum(axis=1).max() == pytest.approx(1.0, abs=1e-6)
@@ -0,0 +1,148 @@
+"""
+Tests for sharded_retrieval.py using two tiny shards and real spawn workers
+"""
+
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sharded_retrieval import ShardCoordinator, build_shards, normalize_embeddings, write_shard
+
+DIM = 8
+
+
+def make_events(tmp_path, seed=0):
+    rng = np.random.default_rng(seed)
+    events_df = pd.DataFrame({
+        "event_id": [f"e{i}" for i in range(1, 13)],
+        "event name": [f"Event {i}" for i in range(1, 13)],
+        "date": ["2024-05-01"] * 7 + ["2025-03-01"] * 5,
+        "location": ["Toronto, Canada", "Ottawa, Canada"] * 6,
+    })
+    embeddings = rng.normal(size=(len(events_df), DIM)).astype(np.float32)
+    np.save(tmp_path / "event_embeddings.npy", embeddings)
+    events_df.to_csv(tmp_path / "processed_events.csv", index=False)
+    return events_df, embeddings
+
+
+def brute_force(events_df, embeddings, queries, top_n, mask=None):
+    scores = normalize_embeddings(queries) @ normalize_embeddings(embeddings).T
+    if mask is not None:
+        scores[:, ~mask] = -np.inf
+    results = []
+    for row_scores in scores:
+        order = np.argsort(-row_scores)[:top_n]
+        results.append([(row_scores[i], events_df["event_id"].iloc[i]) for i in order if np.isfinite(row_scores[i])])
+    return results
+
+
+def ids_and_scores(results):
+    return [[(score, event_data["event_id"]) for score, event_data in hits] for hits in results]
+
+
+def assert_same(actual, expected):
+    assert len(actual) == len(expected)
+    for hits, expected_hits in zip(actual, expected):
+        assert [event_id for _, event_id in hits] == [event_id for _, event_id in expected_hits]
+        assert np.allclose([score for score, _ in hits], [score for score, _ in expected_hits], atol=1e-5)
+
+
+@pytest.fixture
+def shards(tmp_path):
+    events_df, embeddings = make_events(tmp_path)
+    names = build_shards(
+        tmp_path / "event_embeddings.npy", tmp_path / "processed_events.csv",
+        shard_dir=tmp_path / "shards", by="year"
+    )
+    assert names == ["2024", "2025"]
+    return tmp_path / "shards", events_df, embeddings
+
+
+def test_build_shards_by_region_uses_city(tmp_path):
+    make_events(tmp_path)
+    names = build_shards(
+        tmp_path / "event_embeddings.npy", tmp_path / "processed_events.csv",
+        shard_dir=tmp_path / "regions", by="region"
+    )
+    assert names == ["ottawa", "toronto"]
+
+
+def test_merge_matches_brute_force(shards):
+    shard_dir, events_df, embeddings = shards
+    queries = np.random.default_rng(1).normal(size=(3, DIM))
+    with ShardCoordinator(shard_dir) as coordinator:
+        assert_same(ids_and_scores(coordinator.query_batch(queries, top_n=5)), brute_force(events_df, embeddings, queries, 5))
+        assert_same(ids_and_scores([coordinator.query(queries[0], top_n=20)]), brute_force(events_df, embeddings, queries[:1], 20))
+
+
+def test_retire_and_add_shard(shards):
+    shard_dir, events_df, embeddings = shards
+    queries = np.random.default_rng(2).normal(size=(2, DIM))
+    in_2024 = events_df["date"].str.startswith("2024").to_numpy()
+    with ShardCoordinator(shard_dir) as coordinator:
+        coordinator.retire_shard("2025")
+        assert list(coordinator.shards) == ["2024"]
+        assert_same(ids_and_scores(coordinator.query_batch(queries, top_n=4)), brute_force(events_df, embeddings, queries, 4, in_2024))
+
+        coordinator.add_shard("2025")
+        assert_same(ids_and_scores(coordinator.query_batch(queries, top_n=4)), brute_force(events_df, embeddings, queries, 4))
+
+        with pytest.raises(ValueError):
+            coordinator.add_shard("2025")
+        with pytest.raises(KeyError):
+            coordinator.retire_shard("2026")
+
+
+def test_added_shard_is_normalised(shards, tmp_path):
+    shard_dir, events_df, embeddings = shards
+    extra_df = pd.DataFrame({"event_id": ["x1"], "event name": ["Extra"], "date": ["2026-01-01"], "location": ["Halifax, Canada"]})
+    extra_embedding = np.full((1, DIM), 100.0, dtype=np.float32)
+    extra_path = tmp_path / "extra"
+    extra_path.mkdir()
+    np.save(extra_path / "embeddings.npy", extra_embedding)
+    extra_df.to_csv(extra_path / "events.csv", index=False)
+
+    with ShardCoordinator(shard_dir) as coordinator:
+        coordinator.add_shard("extra", path=str(extra_path))
+        score, event_data = coordinator.query(np.ones(DIM), top_n=1)[0]
+        assert event_data["event_id"] == "x1"
+        assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_dead_worker_does_not_desync_other_shards(shards):
+    shard_dir, events_df, embeddings = shards
+    rng = np.random.default_rng(3)
+    in_2024 = events_df["date"].str.startswith("2024").to_numpy()
+    with ShardCoordinator(shard_dir) as coordinator:
+        coordinator.query_batch(rng.normal(size=(2, DIM)), top_n=3)
+
+        worker = coordinator.shards["2025"].process
+        worker.kill()
+        worker.join()
+        with pytest.raises(RuntimeError):
+            coordinator.query_batch(rng.normal(size=(2, DIM)), top_n=3)
+        assert list(coordinator.shards) == ["2024"]
+
+        # Later queries must get their own replies, not the failed query's
+        for queries in (rng.normal(size=(1, DIM)), rng.normal(size=(3, DIM))):
+            assert_same(ids_and_scores(coordinator.query_batch(queries, top_n=3)), brute_force(events_df, embeddings, queries, 3, in_2024))
+
+
+def test_failed_shard_load_stops_started_workers(shards):
+    shard_dir, events_df, embeddings = shards
+    # Sorts after 2024/2025, so both of those have started workers when it fails
+    bad_path = shard_dir / "zz_bad"
+    bad_path.mkdir()
+    np.save(bad_path / "embeddings.npy", np.ones((3, DIM), dtype=np.float32))
+    events_df.head(2).to_csv(bad_path / "events.csv", index=False)
+
+    with pytest.raises(ValueError):
+        ShardCoordinator(shard_dir)
+    assert mp.active_children() == []
+
+
+def test_write_shard_rejects_mismatched_catalog(tmp_path):
+    with pytest.raises(ValueError):
+        write_shard(tmp_path / "bad", np.zeros((2, DIM)), pd.DataFrame({"event_id": ["e1"]}))